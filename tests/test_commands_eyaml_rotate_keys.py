@@ -170,42 +170,152 @@ yet_another:
         ):
             assert unwrap_node_coords(node) == 'This is a test value.'
 
-    def test_yaml_parsing_error(self, script_runner, imparsible_yaml_file, old_eyaml_keys, new_eyaml_keys):
+    def test_yaml_parsing_error(self, script_runner, tmp_path_factory, old_eyaml_keys, new_eyaml_keys):
+        content = '''# ENC[PKCS7,marks this file as containing EYAML]
+{"json": "is YAML", "but_bad_json": "isn't anything!"'''
+        yaml_file = create_temp_yaml_file(tmp_path_factory, content)
         result = script_runner.run(
             self.command,
             "--newprivatekey={}".format(new_eyaml_keys[0]),
             "--newpublickey={}".format(new_eyaml_keys[1]),
             "--oldprivatekey={}".format(old_eyaml_keys[0]),
             "--oldpublickey={}".format(old_eyaml_keys[1]),
-            imparsible_yaml_file
+            yaml_file
         )
         assert not result.success, result.stderr
         assert "YAML parsing error" in result.stderr
 
-    def test_yaml_syntax_error(self, script_runner, badsyntax_yaml_file, old_eyaml_keys, new_eyaml_keys):
+    def test_yaml_syntax_error(self, script_runner, tmp_path_factory, old_eyaml_keys, new_eyaml_keys):
+        content = """---
+# This ENC[PKCS7,...] YAML content contains a critical syntax error
+& bad_anchor: is bad
+"""
+        yaml_file = create_temp_yaml_file(tmp_path_factory, content)
         result = script_runner.run(
             self.command,
             "--newprivatekey={}".format(new_eyaml_keys[0]),
             "--newpublickey={}".format(new_eyaml_keys[1]),
             "--oldprivatekey={}".format(old_eyaml_keys[0]),
             "--oldpublickey={}".format(old_eyaml_keys[1]),
-            badsyntax_yaml_file
+            yaml_file
         )
         assert not result.success, result.stderr
         assert "YAML syntax error" in result.stderr
 
-    def test_yaml_composition_error(self, script_runner, badcmp_yaml_file, old_eyaml_keys, new_eyaml_keys):
+    def test_yaml_composition_error(self, script_runner, tmp_path_factory, old_eyaml_keys, new_eyaml_keys):
+        content = """---
+# This ENC[PKCS7,...] YAML file is improperly composed
+this is a parsing error: *no such capability
+"""
+        yaml_file = create_temp_yaml_file(tmp_path_factory, content)
         result = script_runner.run(
             self.command,
             "--newprivatekey={}".format(new_eyaml_keys[0]),
             "--newpublickey={}".format(new_eyaml_keys[1]),
             "--oldprivatekey={}".format(old_eyaml_keys[0]),
             "--oldpublickey={}".format(old_eyaml_keys[1]),
-            badcmp_yaml_file
+            yaml_file
         )
         assert not result.success, result.stderr
         assert "YAML composition error" in result.stderr
 
+    def test_skip_files_without_eyaml(self, script_runner, imparsible_yaml_file, old_eyaml_keys, new_eyaml_keys):
+        import os
+
+        # Files lacking EYAML values are not even parsed
+        mtime = os.path.getmtime(imparsible_yaml_file)
+        result = script_runner.run(
+            self.command,
+            "--newprivatekey={}".format(new_eyaml_keys[0]),
+            "--newpublickey={}".format(new_eyaml_keys[1]),
+            "--oldprivatekey={}".format(old_eyaml_keys[0]),
+            "--oldpublickey={}".format(old_eyaml_keys[1]),
+            imparsible_yaml_file
+        )
+        assert result.success, result.stderr
+        assert mtime == os.path.getmtime(imparsible_yaml_file)
+
+    @pytest.mark.parametrize("content,result", [
+        (b"key: ENC[PKCS7,abc]\n", True),
+        (b"key: >\n  E N\n  C [PKCS7,abc]\n", True),
+        ("key: ENC[PKCS7,abc]\n".encode("utf-16"), True),
+        (b"key: ENC(PKCS7,abc)\n", False),
+        (b"key: value\n", False),
+        (b"", False),
+    ])
+    def test_has_eyaml_marker(self, tmp_path, content, result):
+        from yamlpath.commands.eyaml_rotate_keys import has_eyaml_marker
+
+        yaml_file = tmp_path / "test.yaml"
+        yaml_file.write_bytes(content)
+        assert result == has_eyaml_marker(str(yaml_file))
+
+    def test_has_eyaml_marker_unreadable(self, tmp_path):
+        from yamlpath.commands.eyaml_rotate_keys import has_eyaml_marker
+
+        # Files which cannot be scanned are left to the YAML parser
+        assert has_eyaml_marker(str(tmp_path / "no-such-file.yaml"))
+
+    def test_captured_unexpected_error(self, monkeypatch):
+        from types import SimpleNamespace
+        import yamlpath.commands.eyaml_rotate_keys as eyaml_rotate_keys
+
+        processors = []
+        def rotate_yaml_file(args, yaml_file, processor):
+            processors.append(processor)
+            print("Processing {}...".format(yaml_file))
+            raise IsADirectoryError(yaml_file + ".bak")
+
+        # Unexpected errors are returned with the file's output, not raised
+        monkeypatch.setattr(eyaml_rotate_keys, "rotate_yaml_file", rotate_yaml_file)
+        monkeypatch.setattr(eyaml_rotate_keys, "_POOL_WORKER_STATE", {})
+        args = SimpleNamespace(eyaml="eyaml", debug=False, verbose=False, quiet=True)
+        (exit_state, out_text, _, error_text) = (
+            eyaml_rotate_keys._rotate_yaml_file_captured("a.yaml", args))
+        assert 1 == exit_state
+        assert "Processing a.yaml..." in out_text
+        assert "IsADirectoryError: a.yaml.bak" in error_text
+
+        # Every file of a worker process shares one EYAMLProcessor
+        eyaml_rotate_keys._rotate_yaml_file_captured("b.yaml", args)
+        assert processors[0] is processors[1]
+
+    def test_serial_unexpected_error(self, monkeypatch, tmp_path, capsys):
+        import sys
+        import yamlpath.commands.eyaml_rotate_keys as eyaml_rotate_keys
+
+        keys = []
+        for key_name in ("new.pri", "new.pub", "old.pri", "old.pub"):
+            key_file = tmp_path / key_name
+            key_file.write_text("key")
+            keys.append(str(key_file))
+
+        def rotate_yaml_file(args, yaml_file, processor):
+            print("Processing {}...".format(yaml_file))
+            if yaml_file == "a.yaml":
+                raise IsADirectoryError(yaml_file + ".bak")
+            return 0
+
+        # Without a pool, later files are still processed and reported
+        monkeypatch.setattr(eyaml_rotate_keys, "rotate_yaml_file", rotate_yaml_file)
+        monkeypatch.setattr(eyaml_rotate_keys, "cpu_count", lambda: 1)
+        monkeypatch.setattr(sys, "argv", [
+            self.command,
+            "--newprivatekey={}".format(keys[0]),
+            "--newpublickey={}".format(keys[1]),
+            "--oldprivatekey={}".format(keys[2]),
+            "--oldpublickey={}".format(keys[3]),
+            "a.yaml",
+            "b.yaml"
+        ])
+        with pytest.raises(SystemExit) as ex:
+            eyaml_rotate_keys.main()
+        assert 1 == ex.value.code
+
+        captured = capsys.readouterr()
+        assert "Processing b.yaml..." in captured.out
+        assert "IsADirectoryError: a.yaml.bak" in captured.err
+
     def test_corrupted_eyaml_value(self, script_runner, tmp_path_factory, old_eyaml_keys, new_eyaml_keys):
         content = """---
         key: >
@@ -283,6 +393,121 @@ yet_another:
             filedat = fhnd.read()
         assert filedat == content
 
+    def test_duplicate_yaml_files(self, script_runner, tmp_path_factory, old_eyaml_keys, new_eyaml_keys):
+        import os
+
+        content = """---
+        key: >
+          ENC[PKCS7,MIIBiQYJKoZIhvcNAQcDoIIBejCCAXYCAQAxggEhMIIBHQIBADAFMAACAQEw
+          DQYJKoZIhvcNAQEBBQAEggEAPGA1g1Wx50RK8F/Y118w1VT/SnCa7PMfN2OM
+          d82vGeWXm6INmoURMDWEvBUEFCmGZoOMLVlK3LALtUcPEW1N9ztJTypBrqqI
+          1K8L9aZWRNFt7uwsaoHWvk1XjMujP+nn2ZO3OiFYkiWFh0PcFw7cT1TmexB4
+          cNbBtNi7oJ88L17/8rbtJW465cWyj0pPCmwo3OvK39JcuJ2xosujNk4u5AUf
+          TjWwklk3yjPvjG6AvoS4TK+vkmqUcCkyy0tLZR8Xu+3IzYCq+DYH4QBrrrZf
+          pKer9VawzMzxgVXeCgKGEsa3XeSzWtgbyoZVtoBdl3uv2f8rGi5qAlwZ9syO
+          Aold9zBMBgkqhkiG9w0BBwEwHQYJYIZIAWUDBAEqBBDGUmDGJfp2Iqn7bATf
+          r0H9gCBNamGg9iiM92wGcVSkNmGJtVk8yEe3EOVn/QNzQ6v0fw==]
+        """
+        yaml_file = create_temp_yaml_file(tmp_path_factory, content)
+        backup_file = yaml_file + ".bak"
+        yaml_alias = yaml_file + ".alias.yaml"
+        os.symlink(yaml_file, yaml_alias)
+
+        # Each file is rotated only once, however it is named
+        result = script_runner.run(
+            self.command,
+            "--newprivatekey={}".format(new_eyaml_keys[0]),
+            "--newpublickey={}".format(new_eyaml_keys[1]),
+            "--oldprivatekey={}".format(old_eyaml_keys[0]),
+            "--oldpublickey={}".format(old_eyaml_keys[1]),
+            "--backup",
+            yaml_file,
+            yaml_file,
+            yaml_alias
+        )
+        assert result.success, result.stderr
+        assert not os.path.exists(yaml_alias + ".bak")
+
+        with open(backup_file, 'r') as fhnd:
+            filedat = fhnd.read()
+        assert filedat == content
+
+    def test_backup_keeps_original_file(self, script_runner, tmp_path_factory, old_eyaml_keys, new_eyaml_keys):
+        import os
+
+        content = """---
+        key: >
+          ENC[PKCS7,MIIBiQYJKoZIhvcNAQcDoIIBejCCAXYCAQAxggEhMIIBHQIBADAFMAACAQEw
+          DQYJKoZIhvcNAQEBBQAEggEAPGA1g1Wx50RK8F/Y118w1VT/SnCa7PMfN2OM
+          d82vGeWXm6INmoURMDWEvBUEFCmGZoOMLVlK3LALtUcPEW1N9ztJTypBrqqI
+          1K8L9aZWRNFt7uwsaoHWvk1XjMujP+nn2ZO3OiFYkiWFh0PcFw7cT1TmexB4
+          cNbBtNi7oJ88L17/8rbtJW465cWyj0pPCmwo3OvK39JcuJ2xosujNk4u5AUf
+          TjWwklk3yjPvjG6AvoS4TK+vkmqUcCkyy0tLZR8Xu+3IzYCq+DYH4QBrrrZf
+          pKer9VawzMzxgVXeCgKGEsa3XeSzWtgbyoZVtoBdl3uv2f8rGi5qAlwZ9syO
+          Aold9zBMBgkqhkiG9w0BBwEwHQYJYIZIAWUDBAEqBBDGUmDGJfp2Iqn7bATf
+          r0H9gCBNamGg9iiM92wGcVSkNmGJtVk8yEe3EOVn/QNzQ6v0fw==]
+        """
+        yaml_file = create_temp_yaml_file(tmp_path_factory, content)
+        os.chmod(yaml_file, 0o640)
+        hard_link = yaml_file + ".link.yaml"
+        os.link(yaml_file, hard_link)
+        before = os.stat(yaml_file)
+
+        # The original is rewritten in place rather than replaced
+        result = script_runner.run(
+            self.command,
+            "--newprivatekey={}".format(new_eyaml_keys[0]),
+            "--newpublickey={}".format(new_eyaml_keys[1]),
+            "--oldprivatekey={}".format(old_eyaml_keys[0]),
+            "--oldpublickey={}".format(old_eyaml_keys[1]),
+            "--backup",
+            yaml_file
+        )
+        assert result.success, result.stderr
+
+        after = os.stat(yaml_file)
+        assert before.st_ino == after.st_ino
+        assert before.st_mode == after.st_mode
+        assert 2 == after.st_nlink
+
+        with open(hard_link, 'r') as fhnd:
+            filedat = fhnd.read()
+        assert filedat != content
+
+    def test_unexpected_error_keeps_other_output(self, script_runner, tmp_path_factory, old_eyaml_keys, new_eyaml_keys):
+        import os
+
+        content = """---
+        key: >
+          ENC[PKCS7,MIIBiQYJKoZIhvcNAQcDoIIBejCCAXYCAQAxggEhMIIBHQIBADAFMAACAQEw
+          DQYJKoZIhvcNAQEBBQAEggEAPGA1g1Wx50RK8F/Y118w1VT/SnCa7PMfN2OM
+          d82vGeWXm6INmoURMDWEvBUEFCmGZoOMLVlK3LALtUcPEW1N9ztJTypBrqqI
+          1K8L9aZWRNFt7uwsaoHWvk1XjMujP+nn2ZO3OiFYkiWFh0PcFw7cT1TmexB4
+          cNbBtNi7oJ88L17/8rbtJW465cWyj0pPCmwo3OvK39JcuJ2xosujNk4u5AUf
+          TjWwklk3yjPvjG6AvoS4TK+vkmqUcCkyy0tLZR8Xu+3IzYCq+DYH4QBrrrZf
+          pKer9VawzMzxgVXeCgKGEsa3XeSzWtgbyoZVtoBdl3uv2f8rGi5qAlwZ9syO
+          Aold9zBMBgkqhkiG9w0BBwEwHQYJYIZIAWUDBAEqBBDGUmDGJfp2Iqn7bATf
+          r0H9gCBNamGg9iiM92wGcVSkNmGJtVk8yEe3EOVn/QNzQ6v0fw==]
+        """
+        bad_file = create_temp_yaml_file(tmp_path_factory, content)
+        good_file = create_temp_yaml_file(tmp_path_factory, content)
+        os.mkdir(bad_file + ".bak")
+
+        # Every file's output is reported along with the unexpected error
+        result = script_runner.run(
+            self.command,
+            "--newprivatekey={}".format(new_eyaml_keys[0]),
+            "--newpublickey={}".format(new_eyaml_keys[1]),
+            "--oldprivatekey={}".format(old_eyaml_keys[0]),
+            "--oldpublickey={}".format(old_eyaml_keys[1]),
+            "--backup",
+            bad_file,
+            good_file
+        )
+        assert not result.success, result.stderr
+        assert "Processing {}...".format(good_file) in result.stdout
+        assert "IsADirectoryError" in result.stderr
+
     def test_replace_backup_file(self, script_runner, tmp_path_factory, old_eyaml_keys, new_eyaml_keys):
         import os
 
@@ -74,6 +74,42 @@ has: different data
             assert data["document"] == document
             assert data["has"] == has
 
+    ###
+    # get_yaml_data and get_yaml_multidoc_data (CRLF files)
+    ###
+    def test_get_yaml_data_crlf_round_trip(self, quiet_logger, tmp_path):
+        from io import StringIO
+
+        yaml_file = tmp_path / "crlf.yaml"
+        yaml_file.write_bytes(
+            b"---\r\n# comment\r\nkey: value  # trailing\r\nother: x\r\n")
+        yaml = Parsers.get_yaml_editor()
+        (data, loaded) = Parsers.get_yaml_data(
+            yaml, quiet_logger, str(yaml_file))
+        assert loaded == True
+
+        output = StringIO()
+        yaml.dump(data, output)
+        assert "\r" not in output.getvalue()
+        assert "# trailing\n" in output.getvalue()
+
+    def test_get_yaml_multidoc_data_crlf_round_trip(self, quiet_logger, tmp_path):
+        from io import StringIO
+
+        yaml_file = tmp_path / "crlf.yaml"
+        yaml_file.write_bytes(
+            b"---\r\n# comment\r\nkey: 1st  # trailing\r\n"
+            b"---\r\nkey: 2nd  # trailing\r\n")
+        yaml = Parsers.get_yaml_editor()
+        for (data, loaded) in Parsers.get_yaml_multidoc_data(
+                yaml, quiet_logger, str(yaml_file)):
+            assert loaded == True
+
+            output = StringIO()
+            yaml.dump(data, output)
+            assert "\r" not in output.getvalue()
+            assert "# trailing\n" in output.getvalue()
+
     ###
     # stringify_dates
     ###
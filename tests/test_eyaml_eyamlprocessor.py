@@ -1,6 +1,8 @@
+import re
+
 import pytest
 
-from subprocess import run, CalledProcessError
+from subprocess import run, CalledProcessError, PIPE
 
 from ruamel.yaml import YAML
 
@@ -11,7 +13,9 @@ from yamlpath.eyaml import EYAMLProcessor
 from yamlpath.wrappers import ConsolePrinter
 from yamlpath.eyaml.exceptions import EYAMLCommandException
 
-from tests.conftest import requireseyaml, quiet_logger, old_eyaml_keys
+from tests.conftest import (
+    requireseyaml, requireseyamllib, quiet_logger, old_eyaml_keys
+)
 
 
 @requireseyaml
@@ -133,6 +137,17 @@ class Test_eyaml_EYAMLProcessor():
 
         assert actual == expected
 
+    def test_find_eyaml_nodes(self, quiet_logger, eyamldata_f):
+        processor = EYAMLProcessor(quiet_logger, eyamldata_f)
+        expected_paths = [str(path) for path in processor.find_eyaml_paths()]
+        actual_paths = []
+        for (path, node) in processor.find_eyaml_nodes():
+            actual_paths.append(str(path))
+            for node_coordinate in processor.get_nodes(path, mustexist=True):
+                assert node_coordinate.node is node
+
+        assert actual_paths == expected_paths
+
     @requireseyaml
     @pytest.mark.parametrize("yaml_path,compare", [
         ("aliases[&secretIdentity]", "This is not the identity you are looking for."),
@@ -183,9 +198,273 @@ class Test_eyaml_EYAMLProcessor():
 
         assert EYAMLProcessor.is_eyaml_value(encvalue) and yvformat == encformat
 
+    @requireseyaml
+    def test_decrypt_eyaml_batch(self, quiet_logger, eyamldata_f, old_eyaml_keys):
+        processor = EYAMLProcessor(quiet_logger, eyamldata_f, privatekey=old_eyaml_keys[0], publickey=old_eyaml_keys[1])
+        values = list(eyamldata_f["aliases"]) + ["not encrypted"]
+        assert processor.decrypt_eyaml_batch(values) == [
+            "This is not the identity you are looking for.",
+            "There is no secret phrase.",
+            "not encrypted",
+        ]
+
+    def test_decrypt_eyaml_batch_without_cryps(self, quiet_logger):
+        processor = EYAMLProcessor(quiet_logger, None)
+        processor.eyaml = None
+        assert processor.decrypt_eyaml_batch(["some value", 42]) == ["some value", 42]
+
+    @staticmethod
+    def _stub_batch_eyaml(tmp_path, batch_mode):
+        import os
+
+        # Decrypts three known tokens; batches of more than one line either
+        # work, fail, or lose their boundary lines, per batch_mode.
+        calls_file = tmp_path / "calls"
+        eyaml_exe = tmp_path / "eyaml"
+        eyaml_exe.write_text(
+            "#!/bin/sh\n"
+            "echo call >>'" + str(calls_file) + "'\n"
+            "input=$(cat)\n"
+            "if [ \"$(printf '%s\\n' \"$input\" | wc -l)\" -gt 1 ]; then\n"
+            "  case " + batch_mode + " in\n"
+            "    fail) exit 1 ;;\n"
+            "    drop) input=$(printf '%s\\n' \"$input\" | sed '/^[0-9a-f]\\{32\\}$/d') ;;\n"
+            "  esac\n"
+            "fi\n"
+            "printf '%s\\n' \"$input\" | sed"
+            " -e 's/ENC\\[PKCS7,multi\\]/line1\\nline2/'"
+            " -e 's/ENC\\[PKCS7,single\\]/single/'"
+            " -e 's/ENC\\[PKCS7,empty\\]//'\n")
+        os.chmod(eyaml_exe, 0o755)
+        return (str(eyaml_exe), calls_file)
+
+    @pytest.mark.parametrize("batch_mode,calls", [
+        ("work", 1),
+        ("fail", 3),
+        ("drop", 3),
+    ])
+    def test_decrypt_eyaml_batch_fallback(self, quiet_logger, tmp_path, batch_mode, calls):
+        (eyaml_exe, calls_file) = self._stub_batch_eyaml(tmp_path, batch_mode)
+        processor = EYAMLProcessor(quiet_logger, None, binary=eyaml_exe)
+
+        # Failed or ambiguous batches are decrypted one value at a time
+        assert processor.decrypt_eyaml_batch(
+            ["ENC[PKCS7,multi]", "ENC[PKCS7,single]"]
+        ) == ["line1\nline2", "single"]
+        assert calls == len(calls_file.read_text().splitlines())
+
+    def test_decrypt_eyaml_batch_keeps_boundaries(self, quiet_logger, tmp_path):
+        (eyaml_exe, _) = self._stub_batch_eyaml(tmp_path, "work")
+        processor = EYAMLProcessor(quiet_logger, None, binary=eyaml_exe)
+
+        # A multi-line value must never be split across its neighbors
+        with pytest.raises(EYAMLCommandException):
+            processor.decrypt_eyaml_batch(
+                ["ENC[PKCS7,multi]", "ENC[PKCS7,empty]"])
+
+    @requireseyaml
+    @requireseyamllib
+    @pytest.mark.parametrize("output_format", [
+        (EYAMLOutputFormats.STRING),
+        (EYAMLOutputFormats.BLOCK),
+    ])
+    def test_persistent_round_trip(self, quiet_logger, old_eyaml_keys, output_format):
+        processor = EYAMLProcessor(quiet_logger, None, privatekey=old_eyaml_keys[0], publickey=old_eyaml_keys[1], persistent=True)
+        assert processor._get_worker() is not None
+
+        testval = "This value survives a persistent worker."
+        encval = processor.encrypt_eyaml(testval, output_format)
+        assert EYAMLProcessor.is_eyaml_value(encval)
+        assert testval == processor.decrypt_eyaml(encval)
+
+        # Apart from its ciphertext, the worker's output is the eyaml command's
+        workerval = processor._call_worker("ENCRYPT {}".format(output_format), testval)
+        EYAMLProcessor.stop_workers()
+        commandval = run(
+            [EYAMLProcessor.get_eyaml_executable("eyaml"), "encrypt", "--quiet", "--stdin",
+             "--output={}".format(output_format),
+             "--pkcs7-public-key={}".format(old_eyaml_keys[1]),
+             "--pkcs7-private-key={}".format(old_eyaml_keys[0])],
+            stdout=PIPE, input=testval.encode("ascii"), check=True
+        ).stdout.decode("ascii").rstrip()
+        assert (re.sub(r"[A-Za-z0-9+/=]", "x", commandval)
+                == re.sub(r"[A-Za-z0-9+/=]", "x", workerval))
+
+    def test_no_worker_without_keys(self, quiet_logger):
+        processor = EYAMLProcessor(quiet_logger, None, persistent=True)
+        assert processor._get_worker() is None
+
+    def test_persistent_errors_use_eyaml_command(self, quiet_logger, tmp_path, monkeypatch):
+        import os
+
+        ruby_exe = tmp_path / "ruby"
+        ruby_exe.write_text(
+            "#!/bin/sh\n"
+            "echo READY\n"
+            "while read -r operation; do\n"
+            "  read -r length\n"
+            "  head -c \"$length\" >/dev/null\n"
+            "  printf 'ERROR\\n11\\nunsupported'\n"
+            "done\n")
+        eyaml_exe = tmp_path / "eyaml"
+        eyaml_exe.write_text(
+            "#!/bin/sh\n"
+            "cat >/dev/null\n"
+            "if [ decrypt = \"$1\" ]; then echo 'from the command'\n"
+            "else echo 'ENC[PKCS7,fromthecommand]'; fi\n")
+        os.chmod(ruby_exe, 0o755)
+        os.chmod(eyaml_exe, 0o755)
+        monkeypatch.setenv("PATH", str(tmp_path) + os.pathsep + os.environ["PATH"])
+
+        # Values the worker cannot handle are retried with the eyaml command
+        processor = EYAMLProcessor(quiet_logger, None, binary=str(eyaml_exe), privatekey=str(tmp_path / "private"), publickey=str(tmp_path / "public"), persistent=True)
+        try:
+            assert processor._get_worker() is not None
+            assert "from the command" == processor.decrypt_eyaml("ENC[PKCS7,abc]")
+            assert "ENC[PKCS7,fromthecommand]" == processor.encrypt_eyaml("test")
+        finally:
+            EYAMLProcessor.stop_workers()
+
+    def test_persistent_start_timeout(self, quiet_logger, tmp_path, monkeypatch):
+        import os
+        import yamlpath.eyaml.eyamlprocessor as eyamlprocessor
+
+        ruby_exe = tmp_path / "ruby"
+        ruby_exe.write_text("#!/bin/sh\nexec sleep 60\n")
+        os.chmod(ruby_exe, 0o755)
+        monkeypatch.setenv("PATH", str(tmp_path) + os.pathsep + os.environ["PATH"])
+        monkeypatch.setattr(eyamlprocessor, "_EYAML_WORKER_START_TIMEOUT", 0.2)
+
+        # A worker which never reports that it is ready is abandoned
+        processor = EYAMLProcessor(quiet_logger, None, privatekey=str(tmp_path / "private"), publickey=str(tmp_path / "public"), persistent=True)
+        try:
+            assert processor._get_worker() is None
+        finally:
+            EYAMLProcessor.stop_workers()
+
+    def test_persistent_worker_dies(self, quiet_logger, tmp_path, monkeypatch):
+        import os
+
+        ruby_exe = tmp_path / "ruby"
+        ruby_exe.write_text("#!/bin/sh\necho READY\nread -r operation\n")
+        eyaml_exe = tmp_path / "eyaml"
+        eyaml_exe.write_text("#!/bin/sh\ncat >/dev/null\necho 'from the command'\n")
+        os.chmod(ruby_exe, 0o755)
+        os.chmod(eyaml_exe, 0o755)
+        monkeypatch.setenv("PATH", str(tmp_path) + os.pathsep + os.environ["PATH"])
+
+        # A worker which quits mid-request is abandoned for the eyaml command
+        keys = (str(tmp_path / "public"), str(tmp_path / "private"))
+        processor = EYAMLProcessor(quiet_logger, None, binary=str(eyaml_exe), publickey=keys[0], privatekey=keys[1], persistent=True)
+        try:
+            assert processor._get_worker() is not None
+            assert "from the command" == processor.decrypt_eyaml("ENC[PKCS7,abc]")
+            assert EYAMLProcessor._workers[keys] is None
+        finally:
+            EYAMLProcessor.stop_workers()
+
+    @pytest.mark.parametrize("ruby_script", [
+        (None),
+        ("#!/no/such/interpreter\n"),
+    ])
+    def test_persistent_worker_unavailable(self, tmp_path, monkeypatch, ruby_script):
+        import os
+
+        if ruby_script is not None:
+            ruby_exe = tmp_path / "ruby"
+            ruby_exe.write_text(ruby_script)
+            os.chmod(ruby_exe, 0o755)
+        monkeypatch.setenv("PATH", str(tmp_path))
+
+        # Without a runnable ruby, there is no worker
+        assert EYAMLProcessor._spawn_worker(str(tmp_path / "public"), str(tmp_path / "private")) is None
+
+    def test_persistent_stop_timeout(self, quiet_logger, tmp_path, monkeypatch):
+        import os
+        import yamlpath.eyaml.eyamlprocessor as eyamlprocessor
+
+        ruby_exe = tmp_path / "ruby"
+        ruby_exe.write_text("#!/bin/sh\necho READY\nexec sleep 60\n")
+        os.chmod(ruby_exe, 0o755)
+        monkeypatch.setenv("PATH", str(tmp_path) + os.pathsep + os.environ["PATH"])
+        monkeypatch.setattr(eyamlprocessor, "_EYAML_WORKER_STOP_TIMEOUT", 0.2)
+
+        # A worker which ignores the end of its input is killed
+        processor = EYAMLProcessor(quiet_logger, None, privatekey=str(tmp_path / "private"), publickey=str(tmp_path / "public"), persistent=True)
+        worker = processor._get_worker()
+        assert worker is not None
+        EYAMLProcessor.stop_workers()
+        assert worker.returncode is not None
+        assert not EYAMLProcessor._workers
+
+    @requireseyaml
+    def test_decrypt_cache(self, quiet_logger, eyamldata_f, old_eyaml_keys):
+        processor = EYAMLProcessor(quiet_logger, eyamldata_f, privatekey=old_eyaml_keys[0], publickey=old_eyaml_keys[1])
+        encval = eyamldata_f["aliases"][1]
+        assert "There is no secret phrase." == processor.decrypt_eyaml(encval)
+
+        # A repeated ciphertext must not need the eyaml command
+        processor.eyaml = None
+        assert "There is no secret phrase." == processor.decrypt_eyaml(encval)
+
+        # Other instances keep their own caches
+        other = EYAMLProcessor(quiet_logger, None, privatekey=old_eyaml_keys[0], publickey=old_eyaml_keys[1])
+        other.eyaml = None
+        with pytest.raises(EYAMLCommandException):
+            other.decrypt_eyaml(encval)
+
+        # Cleared values must be decrypted again
+        processor.clear_caches()
+        with pytest.raises(EYAMLCommandException):
+            processor.decrypt_eyaml(encval)
+
+    def test_clear_caches(self, quiet_logger, tmp_path):
+        import os
+
+        calls_file = tmp_path / "calls"
+        eyaml_exe = tmp_path / "eyaml"
+        eyaml_exe.write_text(
+            "#!/bin/sh\n"
+            "cat >/dev/null\n"
+            "echo call >>'{}'\n"
+            "echo 'decrypted'\n".format(calls_file))
+        os.chmod(eyaml_exe, 0o755)
+        processor = EYAMLProcessor(quiet_logger, None, binary=str(eyaml_exe))
+
+        assert "decrypted" == processor.decrypt_eyaml("ENC[PKCS7,abc]")
+        assert "decrypted" == processor.decrypt_eyaml("ENC[PKCS7,abc]")
+        assert 1 == len(calls_file.read_text().splitlines())
+
+        processor.clear_caches()
+        assert "decrypted" == processor.decrypt_eyaml("ENC[PKCS7,abc]")
+        assert 2 == len(calls_file.read_text().splitlines())
+
+    @requireseyaml
+    @pytest.mark.parametrize("enable_cache", [
+        (True),
+        (False),
+    ])
+    def test_encrypt_cache(self, quiet_logger, old_eyaml_keys, enable_cache):
+        processor = EYAMLProcessor(quiet_logger, None, privatekey=old_eyaml_keys[0], publickey=old_eyaml_keys[1])
+        processor.enable_encrypt_cache = enable_cache
+        first = processor.encrypt_eyaml("cache me")
+        second = processor.encrypt_eyaml("cache me")
+        assert (first == second) == enable_cache
+
     def test_none_eyaml_value(self):
         assert False == EYAMLProcessor.is_eyaml_value(None)
 
+    @pytest.mark.parametrize("value,result", [
+        ("ENC[PKCS7,MIIx]", True),
+        ("\n  ENC[PKCS7,\n  MIIx]", True),
+        ("E N\nC [GPG,abc]", True),
+        ("ENC(PKCS7,MIIx)", False),
+        ("plain ENC[PKCS7,MIIx]", False),
+        ("", False),
+    ])
+    def test_is_eyaml_value(self, value, result):
+        assert result == EYAMLProcessor.is_eyaml_value(value)
+
     @pytest.mark.parametrize("exe", [
         ("/no/such/file/anywhere"),
         ("this-file-does-not-exist"),
@@ -220,6 +499,22 @@ class Test_eyaml_EYAMLProcessor():
         with pytest.raises(EYAMLCommandException):
             processor.decrypt_eyaml("ENC[...]")
 
+    def test_eyaml_errors_reported(self, quiet_logger, tmp_path):
+        import os
+
+        eyaml_exe = tmp_path / "eyaml"
+        eyaml_exe.write_text("#!/bin/sh\necho 'bad key material' >&2\nexit 1\n")
+        os.chmod(eyaml_exe, 0o755)
+        processor = EYAMLProcessor(quiet_logger, None, binary=str(eyaml_exe))
+
+        with pytest.raises(EYAMLCommandException) as ex:
+            processor.encrypt_eyaml("test")
+        assert "bad key material" in str(ex.value)
+
+        with pytest.raises(EYAMLCommandException) as ex:
+            processor.decrypt_eyaml("ENC[PKCS7,abc]")
+        assert "bad key material" in str(ex.value)
+
     def test_ignore_already_encrypted_cryps(self, quiet_logger):
         processor = EYAMLProcessor(quiet_logger, None)
         testval = "ENC[...]"
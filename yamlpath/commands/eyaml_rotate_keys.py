@@ -6,11 +6,20 @@ files, decrypting with old keys and re-encrypting using replacement keys.
 
 Copyright 2018, 2019 William W. Kimball, Jr. MBA MSIS
 """
+import re
 import sys
 import argparse
+from codecs import BOM_UTF16_BE, BOM_UTF16_LE
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+from functools import partial
+from io import StringIO
+from traceback import format_exc
+from mmap import mmap, ACCESS_READ
 from shutil import copy2
-from os import remove, access, R_OK
-from os.path import isfile, exists
+from os import remove, access, cpu_count, R_OK
+from os.path import isfile, exists, realpath
+from typing import Dict
 
 from ruamel.yaml.scalarstring import FoldedScalarString
 
@@ -21,6 +30,19 @@ from yamlpath.eyaml.enums import EYAMLOutputFormats
 from yamlpath.eyaml import EYAMLProcessor
 from yamlpath.wrappers import ConsolePrinter
 
+# The eyaml command used unless another is specified
+DEFAULT_EYAML_COMMAND = "eyaml"
+
+# Size of the write buffer used when saving rotated YAML files
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Any text which may carry the ENC[ prefix of an EYAML value, which
+# EYAMLProcessor.is_eyaml_value permits to be broken up by whitespace
+EYAML_MARKER = re.compile(rb"E\s*N\s*C\s*\[")
+
+# The EYAMLProcessor of a pool worker process, reused for each of its files
+_POOL_WORKER_STATE: Dict[str, EYAMLProcessor] = {}
+
 def processcli():
     """Process command-line arguments."""
     parser = argparse.ArgumentParser(
@@ -50,7 +72,7 @@ def processcli():
     parser.add_argument("-b", "--backup", action="store_true",
                         help="save a backup of each modified YAML_FILE with an"
                         + " extra .bak file-extension")
-    parser.add_argument("-x", "--eyaml", default="eyaml",
+    parser.add_argument("-x", "--eyaml", default=DEFAULT_EYAML_COMMAND,
                         help="the eyaml binary to use when it isn't on the"
                         + " PATH")
 
@@ -95,7 +117,159 @@ def validateargs(args, log):
     if has_errors:
         sys.exit(1)
 
+def has_eyaml_marker(yaml_file):
+    """Indicate whether a file contains the ENC[ marker of any EYAML value.
+
+    The file is memory-mapped and scanned without being parsed.  Files which
+    cannot be read or are UTF-16 encoded report True so the YAML parser can
+    decide.
+    """
+    try:
+        with open(yaml_file, 'rb') as fhnd:
+            with mmap(fhnd.fileno(), 0, access=ACCESS_READ) as contents:
+                if contents[:2] in (BOM_UTF16_LE, BOM_UTF16_BE):
+                    return True
+                return EYAML_MARKER.search(contents) is not None
+    except ValueError:
+        # Empty files cannot be mapped
+        return False
+    except OSError:
+        return True
+
+def get_processor(args):
+    """Create the EYAMLProcessor which rotates the keys of YAML files.
+
+    Reusing one for every file lets values repeated among the files be
+    decrypted only once.
+    """
+    # A persistent worker runs whatever ruby is on the PATH, so reserve it
+    # for when no particular eyaml command was requested.
+    return EYAMLProcessor(
+        ConsolePrinter(args), None, binary=args.eyaml,
+        persistent=args.eyaml == DEFAULT_EYAML_COMMAND)
+
 # pylint: disable=locally-disabled,too-many-locals,too-many-branches,too-many-statements
+def rotate_yaml_file(args, yaml_file, processor):
+    """Rotate the EYAML keys of every encrypted value in one YAML file.
+
+    Builds its own ConsolePrinter and YAML editor so it can run in isolation
+    within a worker process, using the given EYAMLProcessor.  Returns the
+    exit state for the file.
+    """
+    log = ConsolePrinter(args)
+    yaml = Parsers.get_yaml_editor()
+    exit_state = 0
+    file_changed = False
+    backup_file = yaml_file + ".bak"
+    seen_anchors = set()
+
+    # Each YAML_FILE must actually be a file
+    if not isfile(yaml_file):
+        log.error("Not a file:  {}".format(yaml_file))
+        return 2
+
+    # Don't bother with the file change update when there's only one input
+    # file.
+    if len(args.yaml_files) > 1:
+        log.info("Processing {}...".format(yaml_file))
+
+    # Don't bother parsing files which cannot contain any EYAML value
+    if not has_eyaml_marker(yaml_file):
+        log.verbose("No EYAML values found in {}.".format(yaml_file))
+        return 0
+
+    # Try to open the file
+    (yaml_data, doc_loaded) = Parsers.get_yaml_data(yaml, log, yaml_file)
+    if not doc_loaded:
+        # An error message has already been logged
+        return 3
+
+    # Gather all EYAML values
+    processor.data = yaml_data
+    rotations = []
+    for (yaml_path, node) in processor.find_eyaml_nodes():
+        # Ignore values which are Aliases for those already gathered
+        anchor_name = Anchors.get_node_anchor(node)
+        if anchor_name is not None:
+            if anchor_name in seen_anchors:
+                continue
+
+            seen_anchors.add(anchor_name)
+
+        # Prefer block (folded) values unless the original YAML value
+        # was already a massivly long (string) line.
+        output = EYAMLOutputFormats.BLOCK
+        if not isinstance(node, FoldedScalarString):
+            output = EYAMLOutputFormats.STRING
+
+        log.verbose("Decrypting value(s) at {}.".format(yaml_path))
+        rotations.append((yaml_path, node, output))
+
+    # Decrypt every gathered value at once with the old EYAML keys
+    processor.publickey = args.oldpublickey
+    processor.privatekey = args.oldprivatekey
+    try:
+        txtvals = processor.decrypt_eyaml_batch(
+            [node for (_, node, _) in rotations])
+    except EYAMLCommandException as ex:
+        log.error(ex)
+        return 3
+
+    # Re-encrypt the values with new EYAML keys
+    processor.publickey = args.newpublickey
+    processor.privatekey = args.newprivatekey
+    for ((yaml_path, _, output), txtval) in zip(rotations, txtvals):
+        try:
+            processor.set_eyaml_value(yaml_path, txtval, output=output)
+        except EYAMLCommandException as ex:
+            log.error(ex)
+            exit_state = 3
+            continue
+
+        file_changed = True
+
+    # Save the changes
+    if file_changed:
+        if args.backup:
+            log.verbose("Saving a backup of {} to {}."
+                        .format(yaml_file, backup_file))
+            if exists(backup_file):
+                remove(backup_file)
+            copy2(yaml_file, backup_file)
+
+        log.verbose("Writing changed data to {}.".format(yaml_file))
+        # Emit through a large buffer to avoid many small writes
+        with open(
+            yaml_file, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE
+        ) as yaml_dump:
+            yaml.dump(yaml_data, yaml_dump)
+
+    return exit_state
+
+def _rotate_yaml_file_captured(yaml_file, args):
+    """Run rotate_yaml_file in a worker process, capturing its output.
+
+    Returns a tuple of the exit state, the captured STDOUT and STDERR text,
+    and the traceback of any unexpected error (otherwise None) so the parent
+    process can write each file's messages without interleaving them with
+    those of other workers and without losing them to another file's error.
+    """
+    out_buffer = StringIO()
+    err_buffer = StringIO()
+    error_text = None
+    with redirect_stdout(out_buffer), redirect_stderr(err_buffer):
+        try:
+            # Reuse one EYAMLProcessor for every file of this worker process
+            if "processor" not in _POOL_WORKER_STATE:
+                _POOL_WORKER_STATE["processor"] = get_processor(args)
+            exit_state = rotate_yaml_file(
+                args, yaml_file, _POOL_WORKER_STATE["processor"])
+        except Exception:  # pylint: disable=broad-except
+            exit_state = 1
+            error_text = format_exc()
+    return (
+        exit_state, out_buffer.getvalue(), err_buffer.getvalue(), error_text)
+
 def main():
     """Perform the work specified via CLI arguments and exit.
 
@@ -105,97 +279,52 @@ def main():
     args = processcli()
     log = ConsolePrinter(args)
     validateargs(args, log)
-    processor = EYAMLProcessor(log, None, binary=args.eyaml)
-
-    # Prep the YAML parser
-    yaml = Parsers.get_yaml_editor()
 
-    # Process the input file(s)
-    in_file_count = len(args.yaml_files)
-    exit_state = 0
+    # Rotate every file only once no matter how many times or by what names
+    # it is given; another pass would decrypt with the wrong keys and, with
+    # --backup, overwrite the original backup with already-rotated content.
+    unique_files = {}
     for yaml_file in args.yaml_files:
-        file_changed = False
-        backup_file = yaml_file + ".bak"
-        seen_anchors = []
-
-        # Each YAML_FILE must actually be a file
-        if not isfile(yaml_file):
-            log.error("Not a file:  {}".format(yaml_file))
-            exit_state = 2
-            continue
-
-        # Don't bother with the file change update when there's only one input
-        # file.
-        if in_file_count > 1:
-            log.info("Processing {}...".format(yaml_file))
-
-        # Try to open the file
-        (yaml_data, doc_loaded) = Parsers.get_yaml_data(yaml, log, yaml_file)
-        if not doc_loaded:
-            # An error message has already been logged
-            exit_state = 3
-            continue
+        unique_files.setdefault(realpath(yaml_file), yaml_file)
+    args.yaml_files = list(unique_files.values())
 
-        # Process all EYAML values
-        processor.data = yaml_data
-        for yaml_path in processor.find_eyaml_paths():
-            # Use ::get_nodes() instead of ::get_eyaml_values() here in order
-            # to ignore values that have already been rotated via their
-            # Anchors.
-            for node_coordinate in processor.get_nodes(
-                yaml_path, mustexist=True
+    # Process the input file(s); every file is independent of the others and
+    # each EYAML value costs an external eyaml call, so spread multiple files
+    # across a pool of processes.
+    exit_state = 0
+    error_texts = []
+    max_workers = min(len(args.yaml_files), cpu_count() or 1)
+    if max_workers > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for (file_state, out_text, err_text, error_text) in executor.map(
+                partial(_rotate_yaml_file_captured, args=args),
+                args.yaml_files
             ):
-                # Ignore values which are Aliases for those already decrypted
-                node = node_coordinate.node
-                anchor_name = Anchors.get_node_anchor(node)
-                if anchor_name is not None:
-                    if anchor_name in seen_anchors:
-                        continue
-
-                    seen_anchors.append(anchor_name)
-
-                log.verbose("Decrypting value(s) at {}.".format(yaml_path))
-                processor.publickey = args.oldpublickey
-                processor.privatekey = args.oldprivatekey
-
-                try:
-                    txtval = processor.decrypt_eyaml(node)
-                except EYAMLCommandException as ex:
-                    log.error(ex)
-                    exit_state = 3
-                    continue
-
-                # Prefer block (folded) values unless the original YAML value
-                # was already a massivly long (string) line.
-                output = EYAMLOutputFormats.BLOCK
-                if not isinstance(node, FoldedScalarString):
-                    output = EYAMLOutputFormats.STRING
-
-                # Re-encrypt the value with new EYAML keys
-                processor.publickey = args.newpublickey
-                processor.privatekey = args.newprivatekey
-
+                sys.stdout.write(out_text)
+                sys.stderr.write(err_text)
+                if error_text is not None:
+                    error_texts.append(error_text)
+                if file_state != 0:
+                    exit_state = file_state
+    else:
+        processor = get_processor(args)
+        try:
+            for yaml_file in args.yaml_files:
                 try:
-                    processor.set_eyaml_value(yaml_path, txtval, output=output)
-                except EYAMLCommandException as ex:
-                    log.error(ex)
-                    exit_state = 3
-                    continue
-
-                file_changed = True
-
-        # Save the changes
-        if file_changed:
-            if args.backup:
-                log.verbose("Saving a backup of {} to {}."
-                            .format(yaml_file, backup_file))
-                if exists(backup_file):
-                    remove(backup_file)
-                copy2(yaml_file, backup_file)
-
-            log.verbose("Writing changed data to {}.".format(yaml_file))
-            with open(yaml_file, 'w', encoding='utf-8') as yaml_dump:
-                yaml.dump(yaml_data, yaml_dump)
+                    file_state = rotate_yaml_file(args, yaml_file, processor)
+                except Exception:  # pylint: disable=broad-except
+                    file_state = 1
+                    error_texts.append(format_exc())
+                if file_state != 0:
+                    exit_state = file_state
+        finally:
+            processor.clear_caches()
+
+    # Report unexpected errors only once every file's output is written
+    for error_text in error_texts:
+        sys.stderr.write(error_text)
+    if error_texts:
+        exit_state = 1
 
     sys.exit(exit_state)
 
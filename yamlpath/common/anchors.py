@@ -186,11 +186,7 @@ class Anchors:
 
         Returns:  (str) The node's Anchor/Alias name or None when unset
         """
-        if (
-                not hasattr(node, "anchor")
-                or node.anchor is None
-                or node.anchor.value is None
-                or not node.anchor.value
-        ):
+        anchor = getattr(node, "anchor", None)
+        if anchor is None or not anchor.value:
             return None
-        return str(node.anchor.value)
+        return str(anchor.value)
@@ -4,10 +4,16 @@ Implements an EYAML-capable version of YAML Path.
 Copyright 2018, 2019, 2020 William W. Kimball, Jr. MBA MSIS
 """
 import re
-from subprocess import run, PIPE, CalledProcessError
+import atexit
+from hashlib import sha256
+from secrets import token_hex
+from subprocess import (
+    run, CalledProcessError, DEVNULL, PIPE, Popen, TimeoutExpired
+)
 from os import access, sep, X_OK
 from shutil import which
-from typing import Any, Generator, List, Optional, Union
+from threading import Thread
+from typing import Any, Dict, Generator, List, Optional, Tuple, Union
 
 from ruamel.yaml.comments import CommentedSeq, CommentedMap
 
@@ -20,11 +26,82 @@ from yamlpath.wrappers import ConsolePrinter, NodeCoords
 from yamlpath import Processor
 
 
+# Matches the ENC[ prefix of an EYAML value, tolerating the spaces and line
+# breaks which block-formatted values may carry before and within it.
+_EYAML_PREFIX = re.compile(r"[\n ]*E[\n ]*N[\n ]*C[\n ]*\[")
+
+
+# Seconds to wait for a persistent eyaml worker to report that it is ready
+_EYAML_WORKER_START_TIMEOUT: float = 30
+
+# Seconds to wait for a persistent eyaml worker to exit once its input ends
+_EYAML_WORKER_STOP_TIMEOUT: float = 5
+
+
+# Ruby program run as a persistent eyaml worker.  It loads the hiera-eyaml
+# library and keys once and then serves framed requests from STDIN until EOF.
+# Requests are "<OPERATION>\n<byte length>\n<payload>", where OPERATION is
+# DECRYPT or "ENCRYPT <string|block>", and each reply is
+# "<OK|ERROR>\n<byte length>\n<payload>".
+_EYAML_WORKER_SCRIPT = r"""
+require 'hiera/backend/eyaml'
+require 'hiera/backend/eyaml/options'
+require 'hiera/backend/eyaml/encryptor'
+
+EYAML = Hiera::Backend::Eyaml
+EYAML::Options[:pkcs7_public_key] = ARGV[0]
+EYAML::Options[:pkcs7_private_key] = ARGV[1]
+$stdin.binmode
+$stdout.binmode
+
+def reply(status, payload)
+  payload = payload.to_s.b
+  $stdout.write("#{status}\n#{payload.bytesize}\n", payload)
+  $stdout.flush
+end
+
+$stdout.write("READY\n")
+$stdout.flush
+while (operation = $stdin.gets)
+  payload = $stdin.read($stdin.gets.to_i).to_s
+  begin
+    case operation.chomp
+    when 'DECRYPT'
+      match = payload.match(/\AENC\[(\w+),([A-Za-z0-9+\/=\s]+)\]\z/)
+      raise ArgumentError, 'not an EYAML value' if match.nil?
+      encryptor = EYAML::Encryptor.find(match[1])
+      reply('OK', encryptor.decrypt(encryptor.decode(match[2])))
+    when 'ENCRYPT string', 'ENCRYPT block'
+      encryptor = EYAML::Encryptor.find('PKCS7')
+      cipher = encryptor.encode(encryptor.encrypt(payload)).gsub(/\s/, '')
+      # Like the eyaml command, wrap BLOCK ciphertexts at 60 characters and
+      # indent every line by four spaces
+      if operation.chomp.end_with?('block')
+        cipher = cipher.scan(/.{1,60}/).join("\n    ")
+        reply('OK', "    ENC[PKCS7,#{cipher}]")
+      else
+        reply('OK', "ENC[PKCS7,#{cipher}]")
+      end
+    else
+      raise ArgumentError, "unknown operation, #{operation.chomp}"
+    end
+  rescue StandardError => ex
+    reply('ERROR', ex.message)
+  end
+end
+"""
+
+
 class EYAMLProcessor(Processor):
     """Extend Processor to understand EYAML content."""
 
+    # Persistent eyaml workers shared by every instance within this process,
+    # keyed by (publickey, privatekey); None marks a worker which could not be
+    # started.
+    _workers: Dict[Tuple[str, str], Optional["Popen[bytes]"]] = {}
+
     def __init__(
-        self, logger: ConsolePrinter, data: Any, **kwargs: Optional[str]
+        self, logger: ConsolePrinter, data: Any, **kwargs: Any
     ) -> None:
         """
         Instantiate an EYAMLProcessor.
@@ -41,6 +118,13 @@ class EYAMLProcessor(Processor):
             for use with data encryption
         * privatekey (Optional[str]) Fully-qualified path to the public key
             for use with data decryption
+        * persistent (bool) Perform encryption and decryption through a
+            long-lived Ruby process which loads the hiera-eyaml library and
+            both keys only once, rather than running the eyaml command for
+            every value; falls back to the eyaml command whenever that process
+            cannot be started or fails to decrypt or encrypt a value.  That
+            process runs the ruby command found on the PATH, bypassing
+            binary.  Requires both keys to be set.  Default=False
 
         Returns:  N/A
 
@@ -49,24 +133,31 @@ class EYAMLProcessor(Processor):
         self.eyaml: str = str(kwargs.pop("binary", "eyaml"))
         self.publickey: Optional[str] = kwargs.pop("publickey", None)
         self.privatekey: Optional[str] = kwargs.pop("privatekey", None)
+        self.persistent: bool = bool(kwargs.pop("persistent", False))
+        self.enable_encrypt_cache: bool = False
+        # Decrypted values keyed by (privatekey, SHA-256 digest of the
+        # ciphertext) so that repeated ciphertexts are decrypted only once
+        self._dec_cache: Dict[Tuple[Optional[str], bytes], str] = {}
+        self._enc_cache: Dict[
+            Tuple[str, EYAMLOutputFormats, Optional[str]], str] = {}
         super().__init__(logger, data)
 
     # pylint: disable=locally-disabled,too-many-branches
-    def _find_eyaml_paths(
+    def _find_eyaml_nodes(
         self, data: Any, build_path: YAMLPath
-    ) -> Generator[YAMLPath, None, None]:
+    ) -> Generator[Tuple[YAMLPath, Any], None, None]:
         """
-        Find every encrypted value and report each as a YAML Path.
+        Find every encrypted value and report each with its YAML Path.
 
-        Recursively generates a set of stringified YAML Paths, each entry
-        leading to an EYAML value within the evaluated YAML data.
+        Recursively generates a set of YAML Paths, each paired with the EYAML
+        value it leads to within the evaluated YAML data.
 
         Parameters:
         1. data (Any) The parsed YAML data to process
         2. build_path (YAMLPath) A YAML Path under construction
 
-        Returns:  (Generator[Path, None, None]) each YAML Path entry as they
-            are discovered
+        Returns:  (Generator[Tuple[YAMLPath, Any], None, None]) each YAML Path
+            and its EYAML node as they are discovered
 
         Raises:  N/A
         """
@@ -82,20 +173,20 @@ class EYAMLProcessor(Processor):
 
                 tmp_path = build_path + tmp_path_segment
                 if self.is_eyaml_value(ele):
-                    yield tmp_path
+                    yield (tmp_path, ele)
                 else:
-                    for subpath in self._find_eyaml_paths(ele, tmp_path):
-                        yield subpath
+                    for subnode in self._find_eyaml_nodes(ele, tmp_path):
+                        yield subnode
 
         elif isinstance(data, CommentedMap):
             for key, val in data.non_merged_items():
                 tmp_path = build_path + YAMLPath.escape_path_section(
                     key, PathSeperators.DOT)
                 if self.is_eyaml_value(val):
-                    yield tmp_path
+                    yield (tmp_path, val)
                 else:
-                    for subpath in self._find_eyaml_paths(val, tmp_path):
-                        yield subpath
+                    for subnode in self._find_eyaml_nodes(val, tmp_path):
+                        yield subnode
 
     def find_eyaml_paths(self) -> Generator[YAMLPath, None, None]:
         """
@@ -109,9 +200,28 @@ class EYAMLProcessor(Processor):
         Raises:  N/A
         """
         # Initiate the scan from the data root
-        for path in self._find_eyaml_paths(self.data, YAMLPath()):
+        for (path, _) in self._find_eyaml_nodes(self.data, YAMLPath()):
             yield path
 
+    def find_eyaml_nodes(self) -> Generator[Tuple[YAMLPath, Any], None, None]:
+        """
+        Find every encrypted value and report it with its YAML Path.
+
+        Unlike resolving each result of find_eyaml_paths() through
+        get_nodes(), this yields every EYAML node during a single walk of the
+        data.
+
+        Parameters:  N/A
+
+        Returns:  (Generator[Tuple[YAMLPath, Any], None, None]) each YAML Path
+            and its EYAML node as they are discovered
+
+        Raises:  N/A
+        """
+        # Initiate the scan from the data root
+        for path_node in self._find_eyaml_nodes(self.data, YAMLPath()):
+            yield path_node
+
     def decrypt_eyaml(
         self, value: Union[str, list, NodeCoords]
     ) -> Union[str, list]:
@@ -140,42 +250,42 @@ class EYAMLProcessor(Processor):
         if not self.is_eyaml_value(value):
             return value
 
+        # Identical ciphertexts are decrypted only once
+        cleanval: str = str(value).replace("\n", "").replace(" ", "").rstrip()
+        cache_key: Tuple[Optional[str], bytes] = self._get_decrypt_cache_key(
+            cleanval)
+        if cache_key in self._dec_cache:
+            return self._dec_cache[cache_key]
+
         if not self._can_run_eyaml():
             raise EYAMLCommandException("No accessible eyaml command.")
 
-        cmd: List[str] = [
-            self.eyaml,
-            'decrypt',
-            '--quiet',
-            '--stdin'
-        ]
-        if self.publickey:
-            cmd.append(f"--pkcs7-public-key={self.publickey}")
-        if self.privatekey:
-            cmd.append(f"--pkcs7-private-key={self.privatekey}")
-
-        cleanval: str = str(value).replace("\n", "").replace(" ", "").rstrip()
-        bval: bytes = cleanval.encode("ascii")
-        self.logger.debug(
-            f"About to execute {' '.join(cmd)} against:\n{cleanval}",
-            prefix="EYAMLPath::decrypt_eyaml:  "
-        )
+        retval: Optional[str] = self._call_worker("DECRYPT", cleanval)
+        if retval is not None:
+            # Trailing whitespace is dropped just as from the eyaml command
+            retval = retval.rstrip()
+        else:
+            cmd: List[str] = self._get_decrypt_command()
+            bval: bytes = cleanval.encode("ascii")
+            self.logger.debug(
+                f"About to execute {' '.join(cmd)} against:\n{cleanval}",
+                prefix="EYAMLPath::decrypt_eyaml:  "
+            )
 
-        try:
-            # self.eyaml is untrusted, so shell must always be False and
-            # all parameters must be supplied via a List.
-            retval: str = run(
-                cmd,
-                stdout=PIPE,
-                input=bval,
-                check=True,
-                shell=False
-            ).stdout.decode('ascii').rstrip()
-        except CalledProcessError as ex:
-            raise EYAMLCommandException(
-                f"The {self.eyaml} command cannot be run due to exit code:"
-                f"  {ex.returncode}"
-            ) from ex
+            try:
+                # self.eyaml is untrusted, so shell must always be False and
+                # all parameters must be supplied via a List.
+                retval = run(
+                    cmd,
+                    stdout=PIPE,
+                    stderr=PIPE,
+                    input=bval,
+                    check=True,
+                    shell=False
+                ).stdout.decode('ascii').rstrip()
+            except CalledProcessError as ex:
+                raise EYAMLCommandException(
+                    self._get_command_error(ex)) from ex
 
         # Check for bad decryptions
         self.logger.debug(
@@ -188,8 +298,106 @@ class EYAMLProcessor(Processor):
                 "    {cleanval}"
             )
 
+        self._dec_cache[cache_key] = retval
         return retval
 
+    def decrypt_eyaml_batch(
+        self, values: List[Any]
+    ) -> List[Union[str, list]]:
+        """
+        Decrypt many EYAML values using a single run of the eyaml command.
+
+        The eyaml command decrypts every ENC[] token in its input stream, so
+        all distinct, not-yet-decrypted values are fed to it at once,
+        separated by a random boundary line which it passes through unchanged.
+        When the result is ambiguous -- as when any decrypted value is empty
+        -- or the batch fails, every value is instead decrypted individually
+        so any offending value is precisely reported.
+
+        Parameters:
+        1. values (List[Any]) The EYAML values to decrypt
+
+        Returns:  (List[Union[str, list]]) The decrypted values in the same
+            order as given; values which were not actually encrypted are
+            returned unchanged.
+
+        Raises:
+        - `EYAMLCommandException` when the eyaml binary cannot be utilized or
+          any value cannot be decrypted
+        """
+        # Ordered and de-duplicated
+        pending: Dict[str, None] = {}
+        for value in values:
+            if not self.is_eyaml_value(value):
+                continue
+            cleanval: str = (
+                str(value).replace("\n", "").replace(" ", "").rstrip())
+            if self._get_decrypt_cache_key(cleanval) not in self._dec_cache:
+                pending[cleanval] = None
+
+        if (len(pending) > 1
+                and self._get_worker() is None
+                and self._can_run_eyaml()):
+            self._decrypt_eyaml_batch(list(pending))
+
+        # Every value decrypted by the batch is now cached
+        return [self.decrypt_eyaml(value) for value in values]
+
+    def _decrypt_eyaml_batch(self, cleanvals: List[str]) -> None:
+        """
+        Decrypt many EYAML values with one eyaml run, caching the results.
+
+        Nothing is cached when the batch fails or its result is ambiguous.
+
+        Parameters:
+        1. cleanvals (List[str]) The whitespace-free EYAML values to decrypt
+
+        Returns:  N/A
+
+        Raises:  N/A
+        """
+        cmd: List[str] = self._get_decrypt_command()
+        # Decrypted values may span lines, so frame them with a line which
+        # no decrypted value can be expected to contain.
+        boundary: str = f"\n{token_hex(16)}\n"
+        bval: bytes = boundary.join(cleanvals).encode("ascii")
+        self.logger.debug(
+            f"About to execute {' '.join(cmd)} against {len(cleanvals)}"
+            " values.",
+            prefix="EYAMLPath::_decrypt_eyaml_batch:  "
+        )
+
+        try:
+            # self.eyaml is untrusted, so shell must always be False and
+            # all parameters must be supplied via a List.
+            retvals: List[str] = run(
+                cmd,
+                stdout=PIPE,
+                stderr=PIPE,
+                input=bval,
+                check=True,
+                shell=False
+            ).stdout.decode('ascii').split(boundary)
+        except (CalledProcessError, UnicodeDecodeError) as ex:
+            self.logger.debug(
+                f"Batch decryption failed; falling back to one value at a"
+                f" time:  {ex}",
+                prefix="EYAMLPath::_decrypt_eyaml_batch:  ")
+            return
+
+        retvals = [retval.rstrip() for retval in retvals]
+        if (len(retvals) != len(cleanvals)
+                or any(not retval or retval == cleanval
+                       for retval, cleanval in zip(retvals, cleanvals))):
+            self.logger.debug(
+                "Batch decryption was ambiguous; falling back to one value at"
+                " a time.",
+                prefix="EYAMLPath::_decrypt_eyaml_batch:  ")
+            return
+
+        for cleanval, retval in zip(cleanvals, retvals):
+            self._dec_cache[self._get_decrypt_cache_key(cleanval)] = retval
+
     def encrypt_eyaml(
         self, value: str,
         output: EYAMLOutputFormats = EYAMLOutputFormats.STRING
@@ -210,42 +418,51 @@ class EYAMLProcessor(Processor):
         if self.is_eyaml_value(value):
             return value
 
+        # Every encryption uses a random IV, so reusing a prior result is
+        # opt-in.
+        cache_key: Tuple[str, EYAMLOutputFormats, Optional[str]] = (
+            value, output, self.publickey)
+        if self.enable_encrypt_cache and cache_key in self._enc_cache:
+            return self._enc_cache[cache_key]
+
         if not self._can_run_eyaml():
             raise EYAMLCommandException(
                 f"The eyaml binary is not executable at:  {self.eyaml}"
             )
 
-        cmd: List[str] = [
-            self.eyaml,
-            'encrypt',
-            '--quiet',
-            '--stdin',
-            f"--output={output}"
-        ]
-        if self.publickey:
-            cmd.append(f"--pkcs7-public-key={self.publickey}")
-        if self.privatekey:
-            cmd.append(f"--pkcs7-private-key={self.privatekey}")
-
-        self.logger.debug(
-            f"EYAMLPath::encrypt_eyaml:  About to execute:  {' '.join(cmd)}"
-        )
-        bval: bytes = value.encode("ascii")
-
-        try:
-            # self.eyaml is untrusted, so shell must always be False and
-            # all parameters must be supplied via a List.
-            retval: str = (
-                run(cmd, stdout=PIPE, input=bval, check=True, shell=False)
-                .stdout
-                .decode("ascii")
-                .rstrip()
+        retval: Optional[str] = self._call_worker(f"ENCRYPT {output}", value)
+        if retval is None:
+            cmd: List[str] = [
+                self.eyaml,
+                'encrypt',
+                '--quiet',
+                '--stdin',
+                f"--output={output}"
+            ]
+            if self.publickey:
+                cmd.append(f"--pkcs7-public-key={self.publickey}")
+            if self.privatekey:
+                cmd.append(f"--pkcs7-private-key={self.privatekey}")
+
+            self.logger.debug(
+                "EYAMLPath::encrypt_eyaml:  About to execute:"
+                f"  {' '.join(cmd)}"
             )
-        except CalledProcessError as ex:
-            raise EYAMLCommandException(
-                f"The {self.eyaml} command cannot be run due to exit code:"
-                f"  {ex.returncode}"
-            ) from ex
+            bval: bytes = value.encode("ascii")
+
+            try:
+                # self.eyaml is untrusted, so shell must always be False and
+                # all parameters must be supplied via a List.
+                retval = (
+                    run(cmd, stdout=PIPE, stderr=PIPE, input=bval,
+                        check=True, shell=False)
+                    .stdout
+                    .decode("ascii")
+                    .rstrip()
+                )
+            except CalledProcessError as ex:
+                raise EYAMLCommandException(
+                    self._get_command_error(ex)) from ex
 
         # While exceedingly rare and difficult to test for, it is possible
         # for custom eyaml commands to produce no output.  This is a critical
@@ -266,6 +483,8 @@ class EYAMLProcessor(Processor):
             f"Encrypted result:\n{retval}",
             prefix="EYAMLPath::encrypt_eyaml:  "
         )
+        if self.enable_encrypt_cache:
+            self._enc_cache[cache_key] = retval
         return retval
 
     def set_eyaml_value(
@@ -332,6 +551,223 @@ class EYAMLProcessor(Processor):
             plain_text: Union[str, list] = self.decrypt_eyaml(node.node)
             yield plain_text
 
+    def clear_caches(self) -> None:
+        """
+        Forget every value this instance has decrypted or encrypted.
+
+        Parameters:  N/A
+
+        Returns:  N/A
+
+        Raises:  N/A
+        """
+        self._dec_cache.clear()
+        self._enc_cache.clear()
+
+    def _get_worker(self) -> Optional["Popen[bytes]"]:
+        """
+        Get the persistent eyaml worker for the present keys.
+
+        The worker is started on first use and shared by every instance in
+        this process which uses the same keys.
+
+        Parameters:  N/A
+
+        Returns:  (Popen) The running worker or None when persistent mode is
+            off, either key is unset, or the worker cannot be started
+
+        Raises:  N/A
+        """
+        if not (self.persistent and self.publickey and self.privatekey):
+            return None
+
+        worker_key: Tuple[str, str] = (self.publickey, self.privatekey)
+        if worker_key not in EYAMLProcessor._workers:
+            EYAMLProcessor._workers[worker_key] = (
+                EYAMLProcessor._spawn_worker(
+                    self.publickey, self.privatekey))
+            if EYAMLProcessor._workers[worker_key] is None:
+                self.logger.debug(
+                    "Unable to start a persistent eyaml worker; the eyaml"
+                    " command will be used, instead.",
+                    prefix="EYAMLPath::_get_worker:  ")
+        return EYAMLProcessor._workers[worker_key]
+
+    def _call_worker(self, operation: str, payload: str) -> Optional[str]:
+        """
+        Send one request to the persistent eyaml worker.
+
+        Parameters:
+        1. operation (str) Either DECRYPT or ENCRYPT followed by a space and
+           the EYAMLOutputFormats value to produce
+        2. payload (str) The value to decrypt or encrypt
+
+        Returns:  (str) The worker's result or None when no worker is
+            available or it cannot perform the operation, in which case the
+            eyaml command must be used
+
+        Raises:  N/A
+        """
+        worker: Optional["Popen[bytes]"] = self._get_worker()
+        if worker is None or worker.stdin is None or worker.stdout is None:
+            return None
+
+        bval: bytes = payload.encode("utf-8")
+        try:
+            worker.stdin.write(
+                f"{operation}\n{len(bval)}\n".encode("ascii") + bval)
+            worker.stdin.flush()
+            status: str = worker.stdout.readline().decode("ascii").strip()
+            reply: str = (
+                worker.stdout.read(int(worker.stdout.readline()))
+                .decode("utf-8"))
+        except (OSError, ValueError) as ex:
+            # The worker is gone or confused; stop using it.
+            self.logger.debug(
+                f"Abandoning the persistent eyaml worker:  {ex}",
+                prefix="EYAMLPath::_call_worker:  ")
+            EYAMLProcessor._workers[(str(self.publickey),
+                                     str(self.privatekey))] = None
+            worker.kill()
+            return None
+
+        if status != "OK":
+            # The eyaml command may yet succeed, as with encryptors or
+            # configuration which the worker does not support.
+            self.logger.debug(
+                f"The persistent eyaml worker failed; retrying with the eyaml"
+                f" command:  {reply}",
+                prefix="EYAMLPath::_call_worker:  ")
+            return None
+        return reply
+
+    @staticmethod
+    def _spawn_worker(
+        publickey: str, privatekey: str
+    ) -> Optional["Popen[bytes]"]:
+        """
+        Start a persistent eyaml worker for a pair of EYAML keys.
+
+        Parameters:
+        1. publickey (str) Fully-qualified path to the public key
+        2. privatekey (str) Fully-qualified path to the private key
+
+        Returns:  (Popen) The running worker or None when Ruby or the
+            hiera-eyaml library is unavailable or the worker does not report
+            that it is ready within _EYAML_WORKER_START_TIMEOUT seconds
+
+        Raises:  N/A
+        """
+        ruby: Optional[str] = which("ruby")
+        if ruby is None:
+            return None
+
+        try:
+            # Keys are passed as arguments, never through a shell.  The
+            # worker outlives this call and is ended by stop_workers().
+            # pylint: disable=locally-disabled,consider-using-with
+            worker: "Popen[bytes]" = Popen(
+                [ruby, "-e", _EYAML_WORKER_SCRIPT, publickey, privatekey],
+                stdin=PIPE, stdout=PIPE, stderr=DEVNULL, shell=False)
+        except OSError:
+            return None
+
+        # Never wait indefinitely for a worker which hangs while starting
+        ready: List[bytes] = []
+        if worker.stdout is not None:
+            reader: Thread = Thread(
+                target=lambda stdout: ready.append(stdout.readline()),
+                args=(worker.stdout,), daemon=True)
+            reader.start()
+            reader.join(_EYAML_WORKER_START_TIMEOUT)
+        if not ready or ready[0].strip() != b"READY":
+            worker.kill()
+            worker.wait()
+            return None
+        return worker
+
+    @staticmethod
+    def stop_workers() -> None:
+        """
+        Stop every persistent eyaml worker started by this process.
+
+        This is automatically called when the Python interpreter exits.
+
+        Parameters:  N/A
+
+        Returns:  N/A
+
+        Raises:  N/A
+        """
+        for worker in EYAMLProcessor._workers.values():
+            if worker is None:
+                continue
+            if worker.stdin is not None:
+                worker.stdin.close()
+            try:
+                worker.wait(timeout=_EYAML_WORKER_STOP_TIMEOUT)
+            except TimeoutExpired:
+                worker.kill()
+                worker.wait()
+        EYAMLProcessor._workers.clear()
+
+    def _get_decrypt_cache_key(
+        self, cleanval: str
+    ) -> Tuple[Optional[str], bytes]:
+        """
+        Build the decryption cache key for an EYAML value.
+
+        Parameters:
+        1. cleanval (str) The whitespace-free EYAML value
+
+        Returns:  (Tuple[Optional[str], bytes]) The present private key and
+            the SHA-256 digest of the value
+
+        Raises:  N/A
+        """
+        return (self.privatekey, sha256(cleanval.encode("utf-8")).digest())
+
+    def _get_command_error(self, ex: CalledProcessError) -> str:
+        """
+        Describe a failed run of the eyaml command.
+
+        Parameters:
+        1. ex (CalledProcessError) The failure, with its STDERR captured
+
+        Returns:  (str) The exit code and whatever the command reported
+
+        Raises:  N/A
+        """
+        message: str = (
+            f"The {self.eyaml} command cannot be run due to exit code:"
+            f"  {ex.returncode}")
+        stderr: str = (ex.stderr or b"").decode("utf-8", "replace").strip()
+        if stderr:
+            message += f"\n{stderr}"
+        return message
+
+    def _get_decrypt_command(self) -> List[str]:
+        """
+        Build the eyaml command which decrypts values read from STDIN.
+
+        Parameters:  N/A
+
+        Returns:  (List[str]) The command and its arguments
+
+        Raises:  N/A
+        """
+        cmd: List[str] = [
+            self.eyaml,
+            'decrypt',
+            '--quiet',
+            '--stdin'
+        ]
+        if self.publickey:
+            cmd.append(f"--pkcs7-public-key={self.publickey}")
+        if self.privatekey:
+            cmd.append(f"--pkcs7-private-key={self.privatekey}")
+        return cmd
+
     def _can_run_eyaml(self) -> bool:
         """
         Indicate whether this instance is capable of running the eyaml binary.
@@ -392,4 +828,6 @@ class EYAMLProcessor(Processor):
         """
         if not isinstance(value, str):
             return False
-        return value.replace("\n", "").replace(" ", "").startswith("ENC[")
+        return _EYAML_PREFIX.match(value) is not None
+
+atexit.register(EYAMLProcessor.stop_workers)
@@ -4,7 +4,8 @@ Implement YAML Path.
 Copyright 2019, 2020, 2021 William W. Kimball, Jr. MBA MSIS
 """
 from collections import deque
-from typing import Deque, List, Optional, Union
+from functools import lru_cache
+from typing import Deque, List, Optional, Tuple, Union
 
 from yamlpath.types import PathAttributes, PathSegment
 from yamlpath.exceptions import YAMLPathException
@@ -286,7 +287,6 @@ class YAMLPath:
 
         return self._unescaped.copy()
 
-    # pylint: disable=locally-disabled,too-many-locals,too-many-branches,too-many-statements
     def _parse_path(self,
                     strip_escapes: bool = True
                    ) -> Deque[PathSegment]:
@@ -307,7 +307,30 @@ class YAMLPath:
         Raises:
             - `YAMLPathException` when the YAML Path is invalid
         """
-        yaml_path: str = self.original
+        return deque(YAMLPath._parse_path_segments(
+            self.original, self.seperator, strip_escapes))
+
+    # pylint: disable=locally-disabled,too-many-locals,too-many-branches,too-many-statements
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _parse_path_segments(
+        yaml_path: str, seperator: PathSeperators, strip_escapes: bool
+    ) -> Tuple[PathSegment, ...]:
+        r"""
+        Parse a YAML Path into an immutable, cached tuple of PathSegments.
+
+        Parameters:
+        1. yaml_path (str) The YAML Path to parse
+        2. seperator (PathSeperators) The resolved segment seperator
+        3. strip_escapes (bool) True = Remove leading \ symbols, leaving
+           only the "escaped" symbol.  False = Leave all leading \ symbols
+           intact.
+
+        Returns:  (Tuple[PathSegment, ...]) the parsed PathSegments, if any
+
+        Raises:
+            - `YAMLPathException` when the YAML Path is invalid
+        """
         path_segments: deque = deque()
         segment_id: str = ""
         segment_type: Optional[PathSegmentTypes] = None
@@ -319,7 +342,7 @@ class YAMLPath:
         search_keyword: Optional[PathSearchKeywords] = None
         seeking_regex_delim: bool = False
         capturing_regex: bool = False
-        pathsep: str = str(self.seperator)
+        pathsep: str = str(seperator)
         collector_level: int = 0
         collector_operator: CollectorOperators = CollectorOperators.NONE
         seeking_collector_operator: bool = False
@@ -327,11 +350,11 @@ class YAMLPath:
 
         # Empty paths yield empty queues
         if not yaml_path:
-            return path_segments
+            return tuple(path_segments)
 
         # Infer the first possible position for a top-level Anchor mark
         first_anchor_pos = 0
-        if self.seperator is PathSeperators.FSLASH and len(yaml_path) > 1:
+        if seperator is PathSeperators.FSLASH and len(yaml_path) > 1:
             first_anchor_pos = 1
         seeking_anchor_mark = yaml_path[first_anchor_pos] == "&"
 
@@ -466,7 +489,7 @@ class YAMLPath:
                     # been identified as a special type, assume it is a KEY.
                     if segment_type is None:
                         segment_type = PathSegmentTypes.KEY
-                    path_segments.append(self._expand_splats(
+                    path_segments.append(YAMLPath._expand_splats(
                         yaml_path, segment_id, segment_type))
                     segment_id = ""
 
@@ -517,7 +540,7 @@ class YAMLPath:
                     # been identified as a special type, assume it is a KEY.
                     if segment_type is None:
                         segment_type = PathSegmentTypes.KEY
-                    path_segments.append(self._expand_splats(
+                    path_segments.append(YAMLPath._expand_splats(
                         yaml_path, segment_id, segment_type))
                     segment_id = ""
 
@@ -727,7 +750,7 @@ class YAMLPath:
                     # type, assume it is a KEY.
                     if segment_type is None:
                         segment_type = PathSegmentTypes.KEY
-                    path_segments.append(self._expand_splats(
+                    path_segments.append(YAMLPath._expand_splats(
                         yaml_path, segment_id, segment_type))
                     segment_id = ""
 
@@ -768,10 +791,10 @@ class YAMLPath:
             # type, assume it is a KEY.
             if segment_type is None:
                 segment_type = PathSegmentTypes.KEY
-            path_segments.append(self._expand_splats(
+            path_segments.append(YAMLPath._expand_splats(
                 yaml_path, segment_id, segment_type))
 
-        return path_segments
+        return tuple(path_segments)
 
     @staticmethod
     def _expand_splats(